@@ -9,13 +9,14 @@ from time import time
 
 from . import tmux
 from .misc import run_cmd
+from .session import SessionRegistry
 
 logger = logging.getLogger(__name__)
 
 
 class AppBase:
-    # the model is that AppBase only accesses tms members that AppBase has attached;
-    # AppBase obtain any other tms info by calling self.tmux_mgr.get_<what_we_need>();
+    # the model is that AppBase keeps its own per-session state in self.sessions;
+    # AppBase obtains any other tms info by calling self.tmux_mgr.get_<what_we_need>();
     # so tms is an opaque container
     def __init__(
         self, geom, tab_name_list, wrk_stub, loglevel, housekeeping_interval=5, app=None
@@ -29,36 +30,27 @@ class AppBase:
         self.done = False  # stop procedures complete
         self.app = app
 
-        # data_received line buffering support
-        self.b_siz = 4096
+        # data_received line buffering support; buffers come from a shared pool and
+        # are held only while data_received splits a session's output into lines
+        self.sessions = SessionRegistry(b_siz=4096)
 
         for sess_name in tab_name_list:
-            # the model is that AppBase only accesses tms members that AppBase has
-            # attached; AppBase obtains any other tms info by calling a self.tmux_mgr
-            # get_<what_we_need>(sess_name) function; here, tms is an opaque container
-            tms = self.tmux_mgr.add_session(sess_name)
+            self.tmux_mgr.add_session(sess_name)
             sess_num = self.tmux_mgr.get_num(sess_name)
-            # add pipe's filesystem path to the TmuxSession object
-            tms.pipe = f"{wrk_stub}-pipe-{sess_num}"
+            # the pipe's filesystem path
+            sst = self.sessions.add(sess_name, sess_num, f"{wrk_stub}-pipe-{sess_num}")
             # create fifo
-            os.mkfifo(tms.pipe)
+            os.mkfifo(sst.pipe)
             # command in bash: tmux pipep -t \$0:@0 'cat > /tmp/termestra-pipe'
             pipe_pane_cmd = [
                 "tmux",
                 "pipep",
                 "-t",
                 f"${sess_num}:0",
-                f"cat > {tms.pipe}",
+                f"cat > {sst.pipe}",
             ]
             logger.debug(f"pipe_pane_cmd: {pipe_pane_cmd}")
             run_cmd(pipe_pane_cmd)
-            # add pipe's transport to the TmuxSession object
-            tms.transport = None
-            # add data_received line buffering support to the TmuxSession object
-            # (revisit memoryview buffering)
-            tms.cmd_start_time = None
-            tms.line_buffer = memoryview(bytearray(self.b_siz))
-            tms.b_start = 0
 
     async def _connect_pipe(self, sess_name, pipe):
         tp = await self.loop.connect_read_pipe(
@@ -68,19 +60,29 @@ class AppBase:
 
     def connection_made(self, sess_name, transport):
         logger.info(f"connection_made: '{sess_name}' with transport {transport!r}")
+        # registers the pipe's fd; data_received looks the session up by fd
+        self.sessions.set_transport(self.sessions.get(sess_name), transport)
         if self.app:
             self.app.conn_made(sess_name)
 
     def connection_lost(self, sess_name, exc):
         logger.info(f"connection_lost: '{sess_name}'")
+        tms = self.sessions.get(sess_name)
+        self.sessions.release_buffer(tms)
+        # drops the closed fd from the index before the OS can reuse it
+        self.sessions.set_transport(tms, None)
         if self.app:
             self.app.conn_lost(sess_name, exc)
 
-    def data_received(self, sess_name, data):
+    def data_received(self, fd, data):
         d_siz = len(data)
-        tms = self.tmux_mgr.get_session(sess_name)
+        tms = self.sessions.get_by_fd(fd)
+        sess_name = tms.name
+        b_siz = self.sessions.pool.b_siz
         logger.debug(f"data_received '{sess_name}'")
         now = time()
+        tms.last_recv = now
+        self.sessions.acquire_buffer(tms)
 
         if tms.cmd_start_time is None:
             logger.debug(f"cmd_start_time set, '{sess_name}'")
@@ -92,7 +94,7 @@ class AppBase:
             # FIXME: this chokes on number of copies made
             if get_start:
                 d_siz -= b_room
-            b_room = self.b_siz - tms.b_start
+            b_room = b_siz - tms.b_start
             end = tms.b_start + (b_room if d_siz > b_room else d_siz)
             logger.debug(
                 f"recv_loop get_start: {get_start}; d_siz: {d_siz}; "
@@ -147,6 +149,10 @@ class AppBase:
                     tms.b_start = 0
                     self.data_to_app(sess_name, lines, now - tms.cmd_start_time)
 
+        # the buffer goes back to the pool; a partial line, typically the command
+        # prompt, is kept as residual bytes
+        self.sessions.release_buffer(tms)
+
     def data_to_app(self, sess_name, lines, cmd_time):
         logger.debug(
             f"data_to_app '{sess_name}' -- cmd_time: {cmd_time}; lines: {lines}"
@@ -163,15 +169,15 @@ class AppBase:
             self.app.housekeeping()  # return value to control behaviors below?
         if self.halt:
             logger.debug("housekeeping called to halt")
-            for sess_name in self.tmux_mgr.tmux_session_map:
-                tms = self.tmux_mgr.get_session(sess_name)
-                if not tms.transport.is_closing():
+            for tms in self.sessions:
+                if tms.transport is not None and not tms.transport.is_closing():
                     tms.transport.close()
             for sig in self.sigs:
                 self.loop.remove_signal_handler(sig)
             self.done = True
             return
 
+        self.sessions.release_idle(time(), self.housekeeping_interval)
         self.next_time += self.housekeeping_interval
         self.loop.call_at(self.next_time, self.housekeeping)
 
@@ -183,11 +189,9 @@ class AppBase:
         logger.info("AppBase run")
         self.loop = asyncio.get_event_loop()
         self.loop.set_debug(True if self.loglevel == "DEBUG" else False)
-        for sess_name in self.tmux_mgr.tmux_session_map:
-            tms = self.tmux_mgr.get_session(sess_name)
+        for tms in self.sessions:
             pipe = open(tms.pipe)
-            tp = await self._connect_pipe(sess_name, pipe)
-            tms.transport = tp[0]
+            await self._connect_pipe(tms.name, pipe)
         for sig in self.sigs:
             self.loop.add_signal_handler(sig, partial(self.handle_sig, sig))
         self.next_time = self.loop.time() + self.housekeeping_interval
@@ -205,8 +209,10 @@ class AppBasePipeReadProto(asyncio.protocols.Protocol):
     def __init__(self, app, sess_name):
         self.app = app
         self.sess_name = sess_name
+        self.fd = None
 
     def connection_made(self, transport):
+        self.fd = transport.get_extra_info("pipe").fileno()
         self.app.connection_made(self.sess_name, transport)
 
     def __repr__(self):
@@ -218,7 +224,7 @@ class AppBasePipeReadProto(asyncio.protocols.Protocol):
         self.app.connection_lost(self.sess_name, exc)
 
     def data_received(self, data):
-        self.app.data_received(self.sess_name, data)
+        self.app.data_received(self.fd, data)
 
     def eof_received(self):
         return False
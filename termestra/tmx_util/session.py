@@ -0,0 +1,159 @@
+# -*- coding: utf-8; fill-column: 88 -*-
+
+import logging
+
+from .misc import TermestratorError
+
+logger = logging.getLogger(__name__)
+
+
+class BufferPool:
+    """! Hands out fixed size line buffers on demand and recycles released ones.
+
+    A buffer is held only while a session's output is being split into lines, so
+    memory tracks the number of sessions being serviced rather than the number of
+    panes.  At most max_free released buffers are kept for reuse; any beyond that are
+    left to the garbage collector.
+    """
+
+    def __init__(self, b_siz=4096, max_free=4):
+        self.b_siz = b_siz
+        self.max_free = max_free
+        self.free = []
+        self.in_use = 0
+
+    def acquire(self):
+        self.in_use += 1
+        if self.free:
+            return self.free.pop()
+        return memoryview(bytearray(self.b_siz))
+
+    def release(self, buf):
+        self.in_use -= 1
+        if len(self.free) < self.max_free:
+            self.free.append(buf)
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} b_siz={self.b_siz} in_use={self.in_use} "
+            f"free={len(self.free)}>"
+        )
+
+
+class SessionState:
+    """! Per-session state kept by AppBase for each tmux session it pipes from.
+
+    line_buffer is None except while data_received is splitting output into lines; any
+    partial line held at release time is parked in residual until the next acquire.
+    """
+
+    __slots__ = (
+        "name",
+        "num",
+        "pipe",
+        "transport",
+        "fd",
+        "cmd_start_time",
+        "last_recv",
+        "line_buffer",
+        "b_start",
+        "residual",
+    )
+
+    def __init__(self, name, num, pipe):
+        self.name = name
+        self.num = num
+        self.pipe = pipe  # fifo filesystem path
+        self.transport = None
+        self.fd = None
+        self.cmd_start_time = None
+        self.last_recv = None
+        self.line_buffer = None
+        self.b_start = 0
+        self.residual = None
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} name={self.name} num={self.num} "
+            f"fd={self.fd} b_start={self.b_start}>"
+        )
+
+
+class SessionRegistry:
+    """! SessionState records indexed by session name and by pipe fd."""
+
+    def __init__(self, b_siz=4096, max_free=4):
+        self.pool = BufferPool(b_siz, max_free)
+        self.by_name = {}
+        self.by_fd = {}
+        self.held = set()  # sessions currently holding a pool buffer
+
+    def add(self, name, num, pipe):
+        if name in self.by_name:
+            raise TermestratorError(f"Duplicate session name: {name}")
+        state = SessionState(name, num, pipe)
+        self.by_name[name] = state
+        return state
+
+    def get(self, name):
+        state = self.by_name.get(name)
+        if state is None:
+            raise TermestratorError(f"No session state for name: {name}")
+        return state
+
+    def get_by_fd(self, fd):
+        state = self.by_fd.get(fd)
+        if state is None:
+            raise TermestratorError(f"No session state for fd: {fd}")
+        return state
+
+    def set_transport(self, state, transport):
+        # transport None detaches the session, dropping its fd from the index
+        if state.fd is not None:
+            self.by_fd.pop(state.fd, None)
+        state.transport = transport
+        pipe = transport.get_extra_info("pipe") if transport else None
+        state.fd = pipe.fileno() if pipe else None
+        if state.fd is not None:
+            if state.fd in self.by_fd:
+                raise TermestratorError(f"Duplicate session fd: {state.fd}")
+            self.by_fd[state.fd] = state
+
+    def acquire_buffer(self, state):
+        if state.line_buffer is None:
+            state.line_buffer = self.pool.acquire()
+            self.held.add(state)
+            if state.residual is not None:
+                state.line_buffer[: state.b_start] = state.residual
+                state.residual = None
+        return state.line_buffer
+
+    def release_buffer(self, state):
+        # any partial line is parked in residual until the next acquire_buffer
+        if state.line_buffer is None:
+            return
+        if state.b_start:
+            state.residual = bytes(state.line_buffer[: state.b_start])
+        self.pool.release(state.line_buffer)
+        self.held.discard(state)
+        state.line_buffer = None
+
+    def release_idle(self, now, idle_time):
+        """! Releases the buffers of sessions with no output for idle_time seconds.
+
+        data_received returns its buffer after every event, so this is a safety net
+        and only looks at sessions still holding a buffer.
+        """
+        idle = [
+            state
+            for state in self.held
+            if state.last_recv is None or now - state.last_recv >= idle_time
+        ]
+        for state in idle:
+            self.release_buffer(state)
+        if idle:
+            logger.debug(f"release_idle released {len(idle)} buffers; {self.pool!r}")
+        return len(idle)
+
+    def __iter__(self):
+        return iter(self.by_name.values())
@@ -12,9 +12,12 @@ logger = logging.getLogger(__name__)
 
 
 class TmuxSession:
+    __slots__ = ("name", "sess", "num", "pane")
+
     def __init__(self, name, session):
         self.name = name
         self.sess = session  # libtmux session object
+        self.num = int(self.sess.id[1:])  # session id is "$<num>"
         self.pane = self.sess.active_pane
 
     def send_cmd(self, cmd):
@@ -97,8 +100,7 @@ class TmuxMgr:
         return self.tmux_session_map[sess_name]
 
     def get_num(self, sess_name):
-        tms = self.get_session(sess_name)
-        return int(tms.sess.id[1:])
+        return self.get_session(sess_name).num
 
     def send_cmd(self, sess_name, cmd):
         tms = self.get_session(sess_name)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8; fill-column: 88 -*-
+
+import pytest
+
+from termestra.tmx_util.misc import TermestratorError
+from termestra.tmx_util.session import BufferPool, SessionRegistry
+
+
+class FakePipe:
+    def __init__(self, fd):
+        self.fd = fd
+
+    def fileno(self):
+        return self.fd
+
+
+class FakeTransport:
+    def __init__(self, fd):
+        self.pipe = FakePipe(fd)
+
+    def get_extra_info(self, name):
+        return self.pipe if name == "pipe" else None
+
+
+def test_pool_acquire_release_accounting():
+    pool = BufferPool(b_siz=8, max_free=1)
+    buf_a = pool.acquire()
+    buf_b = pool.acquire()
+    assert len(buf_a) == 8
+    assert pool.in_use == 2
+    pool.release(buf_a)
+    pool.release(buf_b)
+    assert pool.in_use == 0
+    assert len(pool.free) == 1  # capped at max_free
+    assert pool.acquire() is buf_a
+    assert pool.in_use == 1
+
+
+def test_residual_kept_and_restored():
+    reg = SessionRegistry(b_siz=8)
+    state = reg.add("a", 0, "/tmp/pipe-0")
+    buf = reg.acquire_buffer(state)
+    assert reg.held == {state}
+    buf[:2] = b"$ "
+    state.b_start = 2
+    reg.release_buffer(state)
+    assert state.line_buffer is None
+    assert state.residual == b"$ "
+    assert reg.held == set()
+    assert reg.pool.in_use == 0
+
+    buf = reg.acquire_buffer(state)
+    assert bytes(buf[: state.b_start]) == b"$ "
+    assert state.residual is None
+
+
+def test_release_without_partial_line_keeps_no_residual():
+    reg = SessionRegistry(b_siz=8)
+    state = reg.add("a", 0, "/tmp/pipe-0")
+    reg.acquire_buffer(state)
+    reg.release_buffer(state)
+    reg.release_buffer(state)  # second release is a no-op
+    assert state.residual is None
+    assert reg.pool.in_use == 0
+
+
+def test_release_idle_only_releases_idle_holders():
+    reg = SessionRegistry(b_siz=8)
+    busy = reg.add("busy", 0, "/tmp/pipe-0")
+    idle = reg.add("idle", 1, "/tmp/pipe-1")
+    reg.add("none", 2, "/tmp/pipe-2")
+    busy.last_recv = 100.0
+    idle.last_recv = 90.0
+    reg.acquire_buffer(busy)
+    reg.acquire_buffer(idle)
+    assert reg.release_idle(100.0, 5) == 1
+    assert idle.line_buffer is None
+    assert reg.held == {busy}
+
+
+def test_duplicate_name_rejected():
+    reg = SessionRegistry()
+    reg.add("a", 0, "/tmp/pipe-0")
+    with pytest.raises(TermestratorError):
+        reg.add("a", 1, "/tmp/pipe-1")
+
+
+def test_duplicate_fd_rejected():
+    reg = SessionRegistry()
+    reg.set_transport(reg.add("a", 0, "/tmp/pipe-0"), FakeTransport(7))
+    with pytest.raises(TermestratorError):
+        reg.set_transport(reg.add("b", 1, "/tmp/pipe-1"), FakeTransport(7))
+
+
+def test_fd_index_cleanup():
+    reg = SessionRegistry()
+    state_a = reg.add("a", 0, "/tmp/pipe-0")
+    reg.set_transport(state_a, FakeTransport(7))
+    assert reg.get_by_fd(7) is state_a
+
+    reg.set_transport(state_a, None)
+    assert state_a.fd is None
+    assert state_a.transport is None
+    with pytest.raises(TermestratorError):
+        reg.get_by_fd(7)
+
+    # the OS reuses the fd number for another session's pipe
+    state_b = reg.add("b", 1, "/tmp/pipe-1")
+    reg.set_transport(state_b, FakeTransport(7))
+    assert reg.get_by_fd(7) is state_b